@@ -6,29 +6,47 @@ Run this to identify common configuration issues that cause "query failed" error
 
 import os
 import sys
-from pathlib import Path
+from functools import lru_cache
 
-# Add backend to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from config import config
-    print("✅ Successfully imported config")
-except Exception as e:
-    print(f"❌ Failed to import config: {e}")
-    sys.exit(1)
+@lru_cache(maxsize=1)
+def read_env_file_keys(env_file):
+    """Return the variable names defined in an .env file, parsed once per run"""
+    keys = []
+    with open(env_file, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '=' in line:
+                keys.append(line[:line.index('=')].strip())
+    return tuple(keys)
+
+def mask_secret(value):
+    """Show only the first and last 4 characters of a secret"""
+    return f"{value[:4]}...{value[-4:]}" if len(value) > 8 else "***"
 
 def main():
+    # Path setup and config import happen here so that importing this
+    # module has no side effects (pytest already puts backend on the path)
+    if BACKEND_DIR not in sys.path:
+        sys.path.append(BACKEND_DIR)
+    try:
+        from config import config
+        print("✅ Successfully imported config")
+    except Exception as e:
+        print(f"❌ Failed to import config: {e}")
+        sys.exit(1)
+    
+    api_key = (config.ANTHROPIC_API_KEY or "").strip()
+
     print("=" * 60)
     print("RAG SYSTEM CONFIGURATION DIAGNOSTICS")
     print("=" * 60)
     
     print("\n🔍 Configuration Values:")
-    print(f"  API Key configured: {bool(config.ANTHROPIC_API_KEY and config.ANTHROPIC_API_KEY.strip())}")
-    if config.ANTHROPIC_API_KEY and config.ANTHROPIC_API_KEY.strip():
-        # Show first and last 4 characters for security
-        key_preview = f"{config.ANTHROPIC_API_KEY[:4]}...{config.ANTHROPIC_API_KEY[-4:]}"
-        print(f"  API Key preview: {key_preview}")
+    print(f"  API Key configured: {bool(api_key)}")
+    if api_key:
+        print(f"  API Key preview: {mask_secret(api_key)}")
     print(f"  Anthropic Model: {config.ANTHROPIC_MODEL}")
     print(f"  Embedding Model: {config.EMBEDDING_MODEL}")
     print(f"  Chunk Size: {config.CHUNK_SIZE}")
@@ -38,17 +56,33 @@ def main():
     print(f"  Chroma Path: {config.CHROMA_PATH}")
     
     print("\n🔍 File System Checks:")
-    chroma_path = Path(config.CHROMA_PATH)
-    print(f"  Chroma Path Exists: {chroma_path.exists()}")
-    if chroma_path.exists():
-        print(f"  Chroma Path Readable: {os.access(chroma_path, os.R_OK)}")
-        print(f"  Chroma Path Writable: {os.access(chroma_path, os.W_OK)}")
-        
+    chroma_path = config.CHROMA_PATH
+    # One directory scan answers both "does it exist" and "which database files"
+    chroma_exists = True
+    db_files = []
+    try:
+        with os.scandir(chroma_path) as entries:
+            db_files = [entry.name for entry in entries if entry.name.endswith(".sqlite3")]
+    except FileNotFoundError:
+        chroma_exists = False
+    except OSError:
+        pass  # Exists but can't be listed; the access checks below show why
+
+    print(f"  Chroma Path Exists: {chroma_exists}")
+    if chroma_exists:
+        # A single access() call covers the usual case; split it only on failure
+        if os.access(chroma_path, os.R_OK | os.W_OK):
+            readable = writable = True
+        else:
+            readable = os.access(chroma_path, os.R_OK)
+            writable = os.access(chroma_path, os.W_OK)
+        print(f"  Chroma Path Readable: {readable}")
+        print(f"  Chroma Path Writable: {writable}")
+
         # Check for database files
-        db_files = list(chroma_path.glob("*.sqlite3"))
         print(f"  Database files found: {len(db_files)}")
         for db_file in db_files:
-            print(f"    - {db_file.name}")
+            print(f"    - {db_file}")
     
     print("\n🔍 Environment Variables:")
     env_vars = [
@@ -59,37 +93,29 @@ def main():
         'MAX_RESULTS',
         'MAX_HISTORY'
     ]
+    # Mask API key for security; everything else is shown as-is
+    display_formatters = {'ANTHROPIC_API_KEY': mask_secret}
+    # Snapshot once so every lookup sees the same environment
+    env_snapshot = dict(os.environ)
     
     for var in env_vars:
-        value = os.getenv(var)
+        value = env_snapshot.get(var)
         if value:
-            if 'API_KEY' in var:
-                # Mask API key for security
-                display_value = f"{value[:4]}...{value[-4:]}" if len(value) > 8 else "***"
-            else:
-                display_value = value
+            formatter = display_formatters.get(var)
+            display_value = formatter(value) if formatter else value
             print(f"  {var}: {display_value}")
         else:
             print(f"  {var}: Not set (using default)")
     
     print("\n🔍 .env File Check:")
-    env_file = Path('.env')
-    if env_file.exists():
+    env_file = '.env'
+    if os.path.isfile(env_file):
         print(f"  .env file exists: ✅")
         print(f"  .env file readable: {os.access(env_file, os.R_OK)}")
         
         # Parse .env file safely
         try:
-            with open(env_file, 'r') as f:
-                lines = f.readlines()
-            
-            env_vars_in_file = []
-            for line in lines:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key = line.split('=')[0].strip()
-                    env_vars_in_file.append(key)
-            
+            env_vars_in_file = read_env_file_keys(env_file)
             print(f"  Variables in .env: {', '.join(env_vars_in_file)}")
             
         except Exception as e:
@@ -99,37 +125,28 @@ def main():
         print("  Consider creating .env file from .env.example")
     
     print("\n🔍 Validation Checks:")
-    issues = []
-    warnings = []
-    
-    # Critical issues
-    if not config.ANTHROPIC_API_KEY or not config.ANTHROPIC_API_KEY.strip():
-        issues.append("ANTHROPIC_API_KEY is missing or empty")
-    
-    if not isinstance(config.CHUNK_SIZE, int) or config.CHUNK_SIZE <= 0:
-        issues.append(f"Invalid CHUNK_SIZE: {config.CHUNK_SIZE}")
-    
-    if not isinstance(config.CHUNK_OVERLAP, int) or config.CHUNK_OVERLAP < 0:
-        issues.append(f"Invalid CHUNK_OVERLAP: {config.CHUNK_OVERLAP}")
-    
-    if config.CHUNK_OVERLAP >= config.CHUNK_SIZE:
-        issues.append(f"CHUNK_OVERLAP ({config.CHUNK_OVERLAP}) >= CHUNK_SIZE ({config.CHUNK_SIZE})")
-    
-    if not isinstance(config.MAX_RESULTS, int) or config.MAX_RESULTS <= 0:
-        issues.append(f"Invalid MAX_RESULTS: {config.MAX_RESULTS}")
-    
-    if not isinstance(config.MAX_HISTORY, int) or config.MAX_HISTORY < 0:
-        issues.append(f"Invalid MAX_HISTORY: {config.MAX_HISTORY}")
-    
-    # Warnings
-    if not chroma_path.exists():
-        warnings.append(f"ChromaDB path does not exist: {config.CHROMA_PATH}")
-    
-    if config.CHUNK_SIZE > 2000:
-        warnings.append(f"Large CHUNK_SIZE ({config.CHUNK_SIZE}) may impact performance")
-    
-    if config.MAX_RESULTS > 20:
-        warnings.append(f"High MAX_RESULTS ({config.MAX_RESULTS}) may impact performance")
+    chunk_size = config.CHUNK_SIZE
+    chunk_overlap = config.CHUNK_OVERLAP
+    max_results = config.MAX_RESULTS
+    max_history = config.MAX_HISTORY
+    
+    # (predicate, message) pairs - a rule is reported when its predicate is true
+    critical_rules = (
+        (lambda: not api_key, "ANTHROPIC_API_KEY is missing or empty"),
+        (lambda: not isinstance(chunk_size, int) or chunk_size <= 0, f"Invalid CHUNK_SIZE: {chunk_size}"),
+        (lambda: not isinstance(chunk_overlap, int) or chunk_overlap < 0, f"Invalid CHUNK_OVERLAP: {chunk_overlap}"),
+        (lambda: chunk_overlap >= chunk_size, f"CHUNK_OVERLAP ({chunk_overlap}) >= CHUNK_SIZE ({chunk_size})"),
+        (lambda: not isinstance(max_results, int) or max_results <= 0, f"Invalid MAX_RESULTS: {max_results}"),
+        (lambda: not isinstance(max_history, int) or max_history < 0, f"Invalid MAX_HISTORY: {max_history}"),
+    )
+    warning_rules = (
+        (lambda: not chroma_exists, f"ChromaDB path does not exist: {chroma_path}"),
+        (lambda: chunk_size > 2000, f"Large CHUNK_SIZE ({chunk_size}) may impact performance"),
+        (lambda: max_results > 20, f"High MAX_RESULTS ({max_results}) may impact performance"),
+    )
+    
+    issues = tuple(message for applies, message in critical_rules if applies())
+    warnings = tuple(message for applies, message in warning_rules if applies())
     
     # Report results
     if issues:
@@ -4,35 +4,66 @@ Pytest configuration and fixtures for RAG system testing.
 import pytest
 import os
 import sys
+from types import MappingProxyType, SimpleNamespace
 from unittest.mock import Mock, MagicMock, patch
 from typing import Dict, List, Any
 
-# Add parent directory to path to import backend modules
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Make backend modules importable once for the whole session, even when
+# pytest is started without the project's pythonpath setting
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
 
-from vector_store import VectorStore, SearchResults
-from ai_generator import AIGenerator
-from search_tools import CourseSearchTool, CourseOutlineTool, ToolManager
-from rag_system import RAGSystem
-from config import Config
+# Backend modules are imported inside the fixtures that use them so that
+# collection doesn't pay for loading anthropic, chromadb and sentence-transformers
 
-@pytest.fixture
+class FakeStore:
+    """Minimal VectorStore stand-in: records search calls and replays canned responses"""
+    
+    def __init__(self):
+        self.calls = []
+        self.lesson_links = []  # Returned one per call before falling back to lesson_link
+        self.reset()
+    
+    def reset(self):
+        """Forget recorded calls and canned responses, reusing the lists"""
+        self.calls.clear()
+        self.lesson_links.clear()
+        self.search_result = None
+        self.search_error = None
+        self.lesson_link = None
+    
+    def search(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.search_error is not None:
+            raise self.search_error
+        return self.search_result
+    
+    def get_lesson_link(self, course_title, lesson_number):
+        if self.lesson_links:
+            return self.lesson_links.pop(0)
+        return self.lesson_link
+
+@pytest.fixture(scope="session")
 def mock_config():
     """Mock configuration with test settings"""
-    config = Mock(spec=Config)
-    config.ANTHROPIC_API_KEY = "test-api-key"
-    config.ANTHROPIC_MODEL = "claude-3-5-sonnet-20241022"
-    config.EMBEDDING_MODEL = "all-MiniLM-L6-v2"
-    config.CHUNK_SIZE = 800
-    config.CHUNK_OVERLAP = 100
-    config.MAX_RESULTS = 5
-    config.MAX_HISTORY = 2
-    config.CHROMA_PATH = "./test_chroma_db"
-    return config
+    # Plain attribute bag: nothing asserts on config access, so Mock's
+    # call tracking and spec checks are pure overhead here
+    return SimpleNamespace(
+        ANTHROPIC_API_KEY="test-api-key",
+        ANTHROPIC_MODEL="claude-3-5-sonnet-20241022",
+        EMBEDDING_MODEL="all-MiniLM-L6-v2",
+        CHUNK_SIZE=800,
+        CHUNK_OVERLAP=100,
+        MAX_RESULTS=5,
+        MAX_HISTORY=2,
+        CHROMA_PATH="./test_chroma_db"
+    )
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_search_results():
     """Mock SearchResults with sample data"""
+    from vector_store import SearchResults
     results = SearchResults(
         documents=["Sample content about RAG systems", "More content about machine learning"],
         metadata=[
@@ -43,20 +74,82 @@ def mock_search_results():
     )
     return results
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def empty_search_results():
     """Mock empty SearchResults"""
+    from vector_store import SearchResults
     return SearchResults(documents=[], metadata=[], distances=[])
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def error_search_results():
     """Mock SearchResults with error"""
+    from vector_store import SearchResults
     return SearchResults.empty("Test error message")
 
+@pytest.fixture(scope="module")
+def results_with_lesson_link():
+    """One result whose metadata carries a lesson number"""
+    from vector_store import SearchResults
+    return SearchResults(
+        documents=["Content with lesson link"],
+        metadata=[{"course_title": "Test Course", "lesson_number": 1, "chunk_id": "chunk1"}],
+        distances=[0.1]
+    )
+
+@pytest.fixture(scope="module")
+def results_without_lesson():
+    """One result with a course title but no lesson number"""
+    from vector_store import SearchResults
+    return SearchResults(
+        documents=["Content without lesson"],
+        metadata=[{"course_title": "Test Course", "chunk_id": "chunk1"}],
+        distances=[0.1]
+    )
+
+@pytest.fixture(scope="module")
+def results_missing_metadata():
+    """One result whose metadata has neither course title nor lesson number"""
+    from vector_store import SearchResults
+    return SearchResults(
+        documents=["Content with incomplete metadata"],
+        metadata=[{"chunk_id": "chunk1"}],
+        distances=[0.1]
+    )
+
+@pytest.fixture(scope="module")
+def multiple_lesson_results():
+    """Two results from different courses and lessons"""
+    from vector_store import SearchResults
+    return SearchResults(
+        documents=["First result content", "Second result content"],
+        metadata=[
+            {"course_title": "Course A", "lesson_number": 1},
+            {"course_title": "Course B", "lesson_number": 2}
+        ],
+        distances=[0.1, 0.2]
+    )
+
+@pytest.fixture(scope="module")
+def new_course_results():
+    """A single result unrelated to mock_search_results, for follow-up searches"""
+    from vector_store import SearchResults
+    return SearchResults(
+        documents=["New content"],
+        metadata=[{"course_title": "New Course", "lesson_number": 3}],
+        distances=[0.1]
+    )
+
+@pytest.fixture(scope="session")
+def _session_vector_store():
+    """The VectorStore mock behind mock_vector_store and rag_system, built once"""
+    from vector_store import VectorStore
+    return Mock(spec=VectorStore)
+
 @pytest.fixture
-def mock_vector_store(mock_search_results):
-    """Mock VectorStore with controlled responses"""
-    store = Mock(spec=VectorStore)
+def mock_vector_store(_session_vector_store, mock_search_results):
+    """Mock VectorStore with controlled responses, reset for each test"""
+    store = _session_vector_store
+    store.reset_mock(return_value=True, side_effect=True)
     store.search.return_value = mock_search_results
     store._resolve_course_name.return_value = "Introduction to RAG"
     store.get_lesson_link.return_value = "https://example.com/lesson1"
@@ -83,76 +176,114 @@ def mock_anthropic_response():
     mock_response.stop_reason = "end_turn"
     return mock_response
 
-@pytest.fixture
+# Anthropic response payloads are only read, never asserted on, so plain
+# namespaces stand in for them; test modules import these builders from here
+def tool_use_block(name, tool_id, tool_input):
+    return SimpleNamespace(type="tool_use", name=name, id=tool_id, input=tool_input)
+
+def text_block(text):
+    return SimpleNamespace(type="text", text=text)
+
+def api_response(content, stop_reason="tool_use"):
+    return SimpleNamespace(content=content, stop_reason=stop_reason)
+
+def _build_tool_response(tool_name, tool_id, tool_input):
+    """A tool-use API response and its single tool block"""
+    block = tool_use_block(tool_name, tool_id, tool_input)
+    return api_response([block]), block
+
+@pytest.fixture(scope="module")
 def mock_anthropic_tool_response():
     """Mock Anthropic API response with tool use"""
-    mock_response = Mock()
-    
-    # Mock content with tool use
-    mock_tool_block = Mock()
-    mock_tool_block.type = "tool_use"
+    # A Mock rather than _build_tool_response(): test_ai_generator reads
+    # attributes (e.g. .text) that a real tool-use block doesn't have
+    mock_tool_block = Mock(type="tool_use", id="tool_12345", input={"query": "test query"})
     mock_tool_block.name = "search_course_content"
-    mock_tool_block.id = "tool_12345"
-    mock_tool_block.input = {"query": "test query"}
-    
-    mock_response.content = [mock_tool_block]
-    mock_response.stop_reason = "tool_use"
-    return mock_response
+    return Mock(content=[mock_tool_block], stop_reason="tool_use")
 
-@pytest.fixture
-def mock_anthropic_client(mock_anthropic_response):
-    """Mock Anthropic client"""
-    with patch('anthropic.Anthropic') as mock_client:
-        client_instance = Mock()
-        client_instance.messages.create.return_value = mock_anthropic_response
-        mock_client.return_value = client_instance
-        yield client_instance
+@pytest.fixture(scope="session")
+def anthropic_client_session():
+    """The Anthropic client Mock, built once for the whole session"""
+    return Mock()
 
 @pytest.fixture
-def course_search_tool(mock_vector_store):
-    """CourseSearchTool instance with mock vector store"""
-    return CourseSearchTool(mock_vector_store)
+def mock_anthropic_client(anthropic_client_session, mock_anthropic_response):
+    """Mock Anthropic client, reset and re-armed for each test"""
+    anthropic_client_session.reset_mock(return_value=True, side_effect=True)
+    anthropic_client_session.messages.create.return_value = mock_anthropic_response
+    # Patch only for the requesting test so other tests see the real class
+    with patch('anthropic.Anthropic', return_value=anthropic_client_session):
+        yield anthropic_client_session
+
+@pytest.fixture(scope="session")
+def course_search_tool():
+    """CourseSearchTool over its own FakeStore, built once per session
+    (so once per worker when pytest-xdist runs the suite).
+    
+    Tests that use it must reset the store and sources first; see the
+    autouse fixture in test_course_search_tool.py.
+    """
+    from search_tools import CourseSearchTool
+    return CourseSearchTool(FakeStore())
 
 @pytest.fixture
 def course_outline_tool(mock_vector_store):
     """CourseOutlineTool instance with mock vector store"""
+    from search_tools import CourseOutlineTool
     return CourseOutlineTool(mock_vector_store)
 
+@pytest.fixture(scope="session")
+def tool_definitions():
+    """Tool schemas, built once - they don't depend on the vector store"""
+    from search_tools import CourseSearchTool, CourseOutlineTool
+    return tuple(tool_cls(None).get_tool_definition() for tool_cls in (CourseSearchTool, CourseOutlineTool))
+
 @pytest.fixture
-def tool_manager(course_search_tool, course_outline_tool):
-    """ToolManager with registered tools"""
+def tool_manager(mock_vector_store, course_outline_tool):
+    """ToolManager with registered tools, both over mock_vector_store"""
+    # Its own search tool rather than the shared course_search_tool, so
+    # nothing carries over between tests
+    from search_tools import CourseSearchTool, ToolManager
     manager = ToolManager()
-    manager.register_tool(course_search_tool)
+    manager.register_tool(CourseSearchTool(mock_vector_store))
     manager.register_tool(course_outline_tool)
     return manager
 
 @pytest.fixture
 def ai_generator(mock_config, mock_anthropic_client):
     """AIGenerator instance with mock client"""
+    from ai_generator import AIGenerator
     with patch('ai_generator.anthropic.Anthropic'):
         generator = AIGenerator(mock_config.ANTHROPIC_API_KEY, mock_config.ANTHROPIC_MODEL)
         generator.client = mock_anthropic_client
         return generator
 
-@pytest.fixture
-def rag_system(mock_config, mock_vector_store):
-    """RAGSystem instance with mocked dependencies"""
-    with patch('rag_system.VectorStore', return_value=mock_vector_store), \
-         patch('rag_system.AIGenerator') as mock_ai_gen, \
-         patch('rag_system.SessionManager') as mock_session, \
+@pytest.fixture(scope="session")
+def _rag_system_session(mock_config, _session_vector_store):
+    """RAGSystem wired to mocks, built once; rag_system re-arms it per test"""
+    from rag_system import RAGSystem
+    with patch('rag_system.VectorStore', return_value=_session_vector_store), \
+         patch('rag_system.AIGenerator'), \
+         patch('rag_system.SessionManager'), \
          patch('rag_system.DocumentProcessor'):
-        
-        mock_ai_gen.return_value.generate_response.return_value = "Test response"
-        mock_session.return_value.create_session.return_value = "test_session_123"
-        mock_session.return_value.get_conversation_history.return_value = None
-        
-        system = RAGSystem(mock_config)
-        return system
+        return RAGSystem(mock_config)
 
 @pytest.fixture
+def rag_system(_rag_system_session, mock_vector_store):
+    """RAGSystem instance with mocked dependencies, reset for each test"""
+    system = _rag_system_session
+    for component in (system.ai_generator, system.session_manager):
+        component.reset_mock(return_value=True, side_effect=True)
+    system.ai_generator.generate_response.return_value = "Test response"
+    system.session_manager.create_session.return_value = "test_session_123"
+    system.session_manager.get_conversation_history.return_value = None
+    system.tool_manager.reset_sources()
+    return system
+
+@pytest.fixture(scope="session")
 def sample_course_data():
-    """Sample course data for testing"""
-    return {
+    """Sample course data for testing (read-only, shared across the session)"""
+    return MappingProxyType({
         "course_title": "Introduction to RAG",
         "course_link": "https://example.com/course",
         "instructor": "Dr. Test",
@@ -170,7 +301,7 @@ def sample_course_data():
                 "content": "RAG can be used for question answering..."
             }
         ]
-    }
+    })
 
 @pytest.fixture
 def environment_variables():
@@ -184,7 +315,19 @@ def environment_variables():
         yield env_vars
 
 # Test helper functions
-@pytest.fixture
+_DEFAULT_TOOL_INPUT = object()  # Lets callers pass tool_input=None through as malformed input
+
+@pytest.fixture(scope="session")
+def make_tool_response():
+    """Factory for tool-use responses; returns (response, tool_block)"""
+    def _make_tool_response(tool_name="search_course_content", tool_id="tool_12345", tool_input=_DEFAULT_TOOL_INPUT):
+        if tool_input is _DEFAULT_TOOL_INPUT:
+            tool_input = {"query": "test query"}
+        return _build_tool_response(tool_name, tool_id, tool_input)
+    
+    return _make_tool_response
+
+@pytest.fixture(scope="session")
 def assert_tool_called():
     """Helper to assert tool was called with correct parameters"""
     def _assert_tool_called(mock_tool, expected_params):
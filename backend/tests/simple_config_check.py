@@ -6,21 +6,80 @@ This will help diagnose the "query failed" issue.
 
 import os
 import sys
+from dataclasses import dataclass
 from pathlib import Path
 
-def check_env_file():
+CHROMA_PATH = Path("./chroma_db")
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """Everything the checks need, probed once up front"""
+    api_key: str | None
+    env_content: str | None  # None when .env is missing or unreadable
+    env_error: str | None
+    env_example_exists: bool
+    chroma_exists: bool
+    chroma_readable: bool
+    chroma_writable: bool
+    db_files_count: int
+    
+    @property
+    def env_exists(self) -> bool:
+        return self.env_content is not None or self.env_error is not None
+
+def take_snapshot() -> ConfigSnapshot:
+    """Read the environment and file system once for all checks"""
+    # Just read .env - a missing file shows up as FileNotFoundError, so
+    # there's no separate exists() probe on the common path
+    env_content = env_error = None
+    try:
+        env_content = Path('.env').read_text()
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        env_error = str(e)
+    env_exists = env_content is not None or env_error is not None
+    
+    chroma_exists = True
+    db_files_count = 0
+    try:
+        # One directory scan answers both "does it exist" and "which database files"
+        with os.scandir(CHROMA_PATH) as entries:
+            db_files_count = sum(1 for entry in entries if entry.name.endswith(".sqlite3"))
+    except FileNotFoundError:
+        chroma_exists = False
+    except OSError:
+        pass  # Exists but can't be listed; the access checks show why
+    
+    # A single access() call covers the usual case; split it only on failure
+    chroma_readable = chroma_writable = False
+    if chroma_exists:
+        if os.access(CHROMA_PATH, os.R_OK | os.W_OK):
+            chroma_readable = chroma_writable = True
+        else:
+            chroma_readable = os.access(CHROMA_PATH, os.R_OK)
+            chroma_writable = os.access(CHROMA_PATH, os.W_OK)
+    
+    return ConfigSnapshot(
+        api_key=os.getenv('ANTHROPIC_API_KEY'),
+        env_content=env_content,
+        env_error=env_error,
+        # Only consulted when .env is missing
+        env_example_exists=not env_exists and os.path.isfile('.env.example'),
+        chroma_exists=chroma_exists,
+        chroma_readable=chroma_readable,
+        chroma_writable=chroma_writable,
+        db_files_count=db_files_count
+    )
+
+def check_env_file(snap: ConfigSnapshot):
     """Check for .env file and its contents"""
     print("🔍 Environment File Check:")
     
-    env_file = Path('.env')
-    env_example = Path('.env.example')
-    
-    if env_file.exists():
+    if snap.env_exists:
         print(f"  ✅ .env file exists")
-        try:
-            with open(env_file, 'r') as f:
-                content = f.read()
-            
+        content = snap.env_content
+        if content is not None:
             has_api_key = 'ANTHROPIC_API_KEY' in content
             print(f"  API key in .env: {'✅' if has_api_key else '❌'}")
             
@@ -30,22 +89,21 @@ def check_env_file():
                     print("  ⚠️  API key appears to be placeholder value")
                 else:
                     print("  ✅ API key appears to be set")
-            
-        except Exception as e:
-            print(f"  ❌ Error reading .env: {e}")
+        else:
+            print(f"  ❌ Error reading .env: {snap.env_error}")
     else:
         print(f"  ❌ .env file missing")
         
-        if env_example.exists():
+        if snap.env_example_exists:
             print(f"  ℹ️  .env.example exists - copy it to .env and set your API key")
         else:
             print(f"  ❌ .env.example also missing")
 
-def check_environment_variables():
+def check_environment_variables(snap: ConfigSnapshot):
     """Check environment variables"""
     print("\n🔍 Environment Variables:")
     
-    api_key = os.getenv('ANTHROPIC_API_KEY')
+    api_key = snap.api_key
     if api_key:
         if api_key.strip():
             print(f"  ✅ ANTHROPIC_API_KEY is set")
@@ -60,22 +118,20 @@ def check_environment_variables():
     else:
         print(f"  ❌ ANTHROPIC_API_KEY not set")
 
-def check_database_path():
+def check_database_path(snap: ConfigSnapshot):
     """Check ChromaDB path"""
     print("\n🔍 Database Path Check:")
     
-    chroma_path = Path("./chroma_db")
-    print(f"  Default path: {chroma_path.absolute()}")
-    print(f"  Path exists: {'✅' if chroma_path.exists() else '❌'}")
+    print(f"  Default path: {CHROMA_PATH.absolute()}")
+    print(f"  Path exists: {'✅' if snap.chroma_exists else '❌'}")
     
-    if chroma_path.exists():
-        print(f"  Readable: {'✅' if os.access(chroma_path, os.R_OK) else '❌'}")
-        print(f"  Writable: {'✅' if os.access(chroma_path, os.W_OK) else '❌'}")
+    if snap.chroma_exists:
+        print(f"  Readable: {'✅' if snap.chroma_readable else '❌'}")
+        print(f"  Writable: {'✅' if snap.chroma_writable else '❌'}")
         
         # Check for database files
-        db_files = list(chroma_path.glob("*.sqlite3"))
-        if db_files:
-            print(f"  Database files: ✅ ({len(db_files)} found)")
+        if snap.db_files_count:
+            print(f"  Database files: ✅ ({snap.db_files_count} found)")
         else:
             print(f"  Database files: ⚠️  None found (may be created on first use)")
     else:
@@ -88,21 +144,21 @@ def main():
     print("This script checks for common causes of 'query failed' errors.")
     print()
     
-    check_env_file()
-    check_environment_variables()
-    check_database_path()
+    snap = take_snapshot()
+    check_env_file(snap)
+    check_environment_variables(snap)
+    check_database_path(snap)
     
     print("\n" + "=" * 60)
     print("DIAGNOSIS:")
     
     # Check the most likely issue
-    api_key = os.getenv('ANTHROPIC_API_KEY')
-    env_file_exists = Path('.env').exists()
+    api_key = snap.api_key
     
     if not api_key or not api_key.strip():
         print("❌ MOST LIKELY ISSUE: Missing ANTHROPIC_API_KEY")
         print("\nSOLUTION:")
-        if not env_file_exists:
+        if not snap.env_exists:
             print("1. Copy .env.example to .env:")
             print("   cp .env.example .env")
         print("2. Edit .env file and set your Anthropic API key:")
@@ -112,10 +168,9 @@ def main():
     else:
         print("✅ API key appears to be configured")
         
-        chroma_path = Path("./chroma_db")
-        if not chroma_path.exists():
+        if not snap.chroma_exists:
             print("⚠️  ChromaDB directory doesn't exist yet (will be created)")
-        elif not os.access(chroma_path, os.W_OK):
+        elif not snap.chroma_writable:
             print("❌ ChromaDB directory not writable")
             return False
         
@@ -128,4 +183,4 @@ def main():
 
 if __name__ == "__main__":
     success = main()
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    sys.exit(0 if success else 1)
@@ -1,11 +1,24 @@
 """
 Unit tests for AIGenerator to diagnose tool calling and API issues.
 """
+import re
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import patch, MagicMock
 from ai_generator import AIGenerator
 import anthropic
 
+from .conftest import api_response, text_block, tool_use_block
+
+# Instructions the system prompt must contain, matched in a single scan
+_REQUIRED_PROMPT_TOKENS = (
+    "search_course_content",
+    "get_course_outline",
+    "Maximum one tool call per query",
+    "Course content questions",
+    "Course outline questions",
+)
+_PROMPT_RE = re.compile("|".join(re.escape(token) for token in _REQUIRED_PROMPT_TOKENS))
+
 
 class TestAIGenerator:
     """Test cases for AIGenerator functionality"""
@@ -74,14 +87,12 @@ class TestAIGenerator:
         assert history in call_args["system"]
         assert "Previous conversation:" in call_args["system"]
     
-    def test_generate_response_with_tools_but_no_tool_use(self, ai_generator, mock_anthropic_client, tool_manager):
+    def test_generate_response_with_tools_but_no_tool_use(self, ai_generator, mock_anthropic_client, tool_manager, tool_definitions):
         """Test response with tools provided but AI doesn't use them"""
         # Setup
         mock_anthropic_client.messages.create.return_value.content[0].text = "Direct response"
         mock_anthropic_client.messages.create.return_value.stop_reason = "end_turn"
         
-        tool_definitions = tool_manager.get_tool_definitions()
-        
         # Execute
         response = ai_generator.generate_response(
             "General knowledge question",
@@ -98,7 +109,7 @@ class TestAIGenerator:
         assert call_args["tools"] == tool_definitions
         assert call_args["tool_choice"] == {"type": "auto"}
     
-    def test_generate_response_with_tool_use(self, ai_generator, mock_anthropic_client, tool_manager, mock_anthropic_tool_response):
+    def test_generate_response_with_tool_use(self, ai_generator, mock_anthropic_client, tool_manager, tool_definitions, mock_anthropic_tool_response):
         """Test response generation with tool calling"""
         # Setup tool execution
         tool_manager.execute_tool.return_value = "Tool execution result"
@@ -106,11 +117,9 @@ class TestAIGenerator:
         # Setup initial response with tool use
         mock_anthropic_client.messages.create.side_effect = [
             mock_anthropic_tool_response,  # First call returns tool use
-            Mock(content=[Mock(text="Final response with tool results")], stop_reason="end_turn")  # Second call returns final answer
+            api_response([text_block("Final response with tool results")], stop_reason="end_turn")  # Second call returns final answer
         ]
         
-        tool_definitions = tool_manager.get_tool_definitions()
-        
         # Execute
         response = ai_generator.generate_response(
             "What is in the MCP course?",
@@ -165,7 +174,7 @@ class TestAIGenerator:
         with pytest.raises(anthropic.InternalServerError):
             ai_generator.generate_response("Test query")
     
-    def test_tool_execution_error(self, ai_generator, mock_anthropic_client, tool_manager, mock_anthropic_tool_response):
+    def test_tool_execution_error(self, ai_generator, mock_anthropic_client, tool_manager, tool_definitions, mock_anthropic_tool_response):
         """Test handling when tool execution fails"""
         # Setup tool manager to raise exception
         tool_manager.execute_tool.side_effect = Exception("Tool execution failed")
@@ -173,11 +182,9 @@ class TestAIGenerator:
         # Setup tool use response
         mock_anthropic_client.messages.create.side_effect = [
             mock_anthropic_tool_response,
-            Mock(content=[Mock(text="Response despite tool error")], stop_reason="end_turn")
+            api_response([text_block("Response despite tool error")], stop_reason="end_turn")
         ]
         
-        tool_definitions = tool_manager.get_tool_definitions()
-        
         # Execute - should not crash
         response = ai_generator.generate_response(
             "Test query",
@@ -191,35 +198,22 @@ class TestAIGenerator:
         # Verify tool execution was attempted
         tool_manager.execute_tool.assert_called_once()
     
-    def test_multiple_tool_calls_in_response(self, ai_generator, mock_anthropic_client, tool_manager):
+    def test_multiple_tool_calls_in_response(self, ai_generator, mock_anthropic_client, tool_manager, tool_definitions):
         """Test handling multiple tool calls in single response"""
         # Setup multiple tool calls
-        mock_tool_block_1 = Mock()
-        mock_tool_block_1.type = "tool_use"
-        mock_tool_block_1.name = "search_course_content"
-        mock_tool_block_1.id = "tool_1"
-        mock_tool_block_1.input = {"query": "first query"}
-        
-        mock_tool_block_2 = Mock()
-        mock_tool_block_2.type = "tool_use"  
-        mock_tool_block_2.name = "get_course_outline"
-        mock_tool_block_2.id = "tool_2"
-        mock_tool_block_2.input = {"course_title": "test course"}
-        
-        mock_response = Mock()
-        mock_response.content = [mock_tool_block_1, mock_tool_block_2]
-        mock_response.stop_reason = "tool_use"
+        mock_response = api_response([
+            tool_use_block("search_course_content", "tool_1", {"query": "first query"}),
+            tool_use_block("get_course_outline", "tool_2", {"course_title": "test course"})
+        ])
         
         # Setup tool manager responses
         tool_manager.execute_tool.side_effect = ["Result 1", "Result 2"]
         
         mock_anthropic_client.messages.create.side_effect = [
             mock_response,
-            Mock(content=[Mock(text="Final response with both results")], stop_reason="end_turn")
+            api_response([text_block("Final response with both results")], stop_reason="end_turn")
         ]
         
-        tool_definitions = tool_manager.get_tool_definitions()
-        
         # Execute
         response = ai_generator.generate_response(
             "Complex query",
@@ -240,11 +234,10 @@ class TestAIGenerator:
         tool_result_message = second_call_args["messages"][2]
         assert len(tool_result_message["content"]) == 2  # Two tool results
     
-    def test_tool_use_without_tool_manager(self, ai_generator, mock_anthropic_client, tool_manager, mock_anthropic_tool_response):
+    def test_tool_use_without_tool_manager(self, ai_generator, mock_anthropic_client, tool_definitions, mock_anthropic_tool_response):
         """Test handling when tools provided but no tool_manager"""
         # Setup
         mock_anthropic_client.messages.create.return_value = mock_anthropic_tool_response
-        tool_definitions = tool_manager.get_tool_definitions()
         
         # Execute without tool_manager
         response = ai_generator.generate_response(
@@ -259,41 +252,27 @@ class TestAIGenerator:
     
     def test_system_prompt_content(self, ai_generator):
         """Test system prompt contains expected instructions"""
-        prompt = ai_generator.SYSTEM_PROMPT
+        found = set(_PROMPT_RE.findall(ai_generator.SYSTEM_PROMPT))
         
         # Verify key instructions are present
-        assert "search_course_content" in prompt
-        assert "get_course_outline" in prompt
-        assert "Maximum one tool call per query" in prompt
-        assert "Course content questions" in prompt
-        assert "Course outline questions" in prompt
+        missing = set(_REQUIRED_PROMPT_TOKENS) - found
+        assert not missing, f"System prompt is missing: {sorted(missing)}"
     
-    def test_handle_tool_execution_with_mixed_content(self, ai_generator, mock_anthropic_client, tool_manager):
+    def test_handle_tool_execution_with_mixed_content(self, ai_generator, mock_anthropic_client, tool_manager, tool_definitions):
         """Test handling response with both text and tool use content"""
         # Setup mixed content response
-        text_block = Mock()
-        text_block.type = "text"
-        text_block.text = "Let me search for that information."
-        
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_123"
-        tool_block.input = {"query": "test query"}
-        
-        mixed_response = Mock()
-        mixed_response.content = [text_block, tool_block]
-        mixed_response.stop_reason = "tool_use"
+        mixed_response = api_response([
+            text_block("Let me search for that information."),
+            tool_use_block("search_course_content", "tool_123", {"query": "test query"})
+        ])
         
         # Setup responses
         tool_manager.execute_tool.return_value = "Search results"
         mock_anthropic_client.messages.create.side_effect = [
             mixed_response,
-            Mock(content=[Mock(text="Here's what I found")], stop_reason="end_turn")
+            api_response([text_block("Here's what I found")], stop_reason="end_turn")
         ]
         
-        tool_definitions = tool_manager.get_tool_definitions()
-        
         # Execute
         response = ai_generator.generate_response(
             "Test query",
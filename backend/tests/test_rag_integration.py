@@ -16,7 +16,9 @@ Test Coverage:
 8. Real user scenarios with proper error propagation
 """
 import pytest
-from unittest.mock import Mock, MagicMock, patch, call
+from collections import namedtuple
+from contextlib import contextmanager
+from unittest.mock import Mock, patch
 from typing import List, Dict, Any
 
 # Import the modules we're testing
@@ -26,48 +28,151 @@ from search_tools import ToolManager, CourseSearchTool, CourseOutlineTool
 from session_manager import SessionManager
 from vector_store import VectorStore, SearchResults
 
+from .conftest import api_response, text_block, tool_use_block
+
+@contextmanager
+def raise_on(obj, attr, exc):
+    """Make obj.attr raise exc inside the block, then put the original back"""
+    original = getattr(obj, attr)
+    setattr(obj, attr, Mock(side_effect=exc))
+    try:
+        yield
+    finally:
+        setattr(obj, attr, original)
+
+# Search payloads are only read by the tools, so one instance can be shared
+_EMPTY_RESULTS = SearchResults(documents=[], metadata=[], distances=[])
+
+# One search-tool round trip: the tool input the AI sends, what the vector
+# store returns for it, the AI's final answer and what the user should get back
+ToolCase = namedtuple(
+    "ToolCase",
+    "query tool_input search_results lesson_link final_text expected_substrings source_count source_needles session_id",
+    defaults=(None,),
+)
+
+_TOOL_CASES = (
+    ToolCase(
+        query="What are RAG systems?",
+        tool_input={"query": "RAG systems", "course_name": "Introduction"},
+        search_results=SearchResults(
+            documents=["RAG stands for Retrieval-Augmented Generation..."],
+            metadata=[{"course_title": "Introduction to RAG", "lesson_number": 1, "chunk_id": "chunk1"}],
+            distances=[0.1]
+        ),
+        lesson_link="https://example.com/lesson1",
+        final_text="RAG stands for Retrieval-Augmented Generation. It combines information retrieval with text generation to provide accurate, contextual responses.",
+        expected_substrings=(),
+        source_count=1,
+        source_needles=("Introduction to RAG - Lesson 1", "https://example.com/lesson1"),
+        session_id="test_session",
+    ),
+    ToolCase(
+        query="What is covered in lesson 2 of the MCP course?",
+        tool_input={"query": "lesson content", "lesson_number": 2},
+        search_results=SearchResults(
+            documents=["Content from lesson 2", "More lesson 2 content"],
+            metadata=[
+                {"course_title": "MCP Course", "lesson_number": 2, "chunk_id": "chunk1"},
+                {"course_title": "MCP Course", "lesson_number": 2, "chunk_id": "chunk2"}
+            ],
+            distances=[0.1, 0.2]
+        ),
+        lesson_link="https://example.com/mcp-lesson2",
+        final_text="Lesson 2 content response",
+        expected_substrings=(),
+        source_count=2,
+        source_needles=("MCP Course - Lesson 2", "https://example.com/mcp-lesson2"),
+    ),
+    ToolCase(
+        query="What is covered in lesson 2 of the MCP course?",
+        tool_input={"query": "covered", "course_name": "MCP", "lesson_number": 2},
+        search_results=SearchResults(
+            documents=["In this lesson, we'll cover MCP server setup and client configuration..."],
+            metadata=[{"course_title": "MCP Protocol Course", "lesson_number": 2, "chunk_id": "lesson2_chunk1"}],
+            distances=[0.05]
+        ),
+        lesson_link="https://courses.example.com/mcp/lesson2",
+        final_text="Lesson 2 of the MCP course covers server setup, client configuration, and basic protocol implementation.",
+        expected_substrings=("server setup", "client configuration"),
+        source_count=1,
+        source_needles=("MCP Protocol Course - Lesson 2", "https://courses.example.com/mcp/lesson2"),
+    ),
+    ToolCase(
+        query="What deployment strategies are discussed in lesson 5 of the DevOps course?",
+        tool_input={"query": "deployment strategies", "course_name": "DevOps", "lesson_number": 5},
+        search_results=SearchResults(
+            documents=["Deployment strategies include blue-green deployment for zero-downtime updates, rolling updates for gradual rollouts..."],
+            metadata=[{
+                "course_title": "DevOps Fundamentals", 
+                "lesson_number": 5, 
+                "chunk_id": "lesson5_deployment_chunk1",
+                "lesson_title": "Deployment Strategies"
+            }],
+            distances=[0.02]
+        ),
+        lesson_link="https://courses.example.com/devops/lesson5-deployment",
+        final_text="Lesson 5 of the DevOps course covers three main deployment strategies: blue-green deployment, rolling updates, and canary deployments. Each has specific use cases and trade-offs.",
+        expected_substrings=("blue-green", "rolling", "canary"),
+        source_count=1,
+        source_needles=("DevOps Fundamentals - Lesson 5", "https://courses.example.com/devops/lesson5-deployment"),
+    ),
+    ToolCase(
+        query="Tell me about nonexistent topic",
+        tool_input={"query": "nonexistent topic"},
+        search_results=_EMPTY_RESULTS,
+        lesson_link=None,
+        final_text="No relevant content found.",
+        expected_substrings=(),
+        source_count=0,
+        source_needles=(),
+    ),
+    ToolCase(
+        query="What advanced topics are covered in NonexistentCourse?",
+        tool_input={"query": "advanced topics", "course_name": "NonexistentCourse"},
+        search_results=_EMPTY_RESULTS,
+        lesson_link=None,
+        final_text="I couldn't find any course matching 'NonexistentCourse'.",
+        expected_substrings=(),
+        source_count=0,
+        source_needles=(),
+    ),
+)
+_TOOL_CASE_IDS = ("content_search", "multiple_sources", "lesson_specific", "complex_devops", "empty_results", "course_not_found")
+
 
 class TestRAGSystemIntegration:
     """Test RAG system end-to-end integration scenarios"""
 
-    def test_end_to_end_content_search_query(self, rag_system, mock_anthropic_client, mock_vector_store):
-        """Test complete flow: user query → AI → tool → vector store → response with sources"""
-        # Setup: Mock AI response that uses the search tool
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_search_123"
-        mock_tool_block.input = {"query": "RAG systems", "course_name": "Introduction"}
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-        
-        # Mock final response after tool execution
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "RAG stands for Retrieval-Augmented Generation. It combines information retrieval with text generation to provide accurate, contextual responses."
-        
-        # Setup anthropic client to return tool use first, then final response
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
+    @pytest.mark.parametrize("case", _TOOL_CASES, ids=_TOOL_CASE_IDS)
+    def test_tool_use_flow(self, rag_system, mock_anthropic_client, mock_vector_store, case, make_tool_response):
+        """Test complete flow: user query → AI → search tool → vector store → response with sources"""
+        # AI asks for the search tool first, then answers with the tool result
+        tool_response, _ = make_tool_response("search_course_content", "tool_search_123", case.tool_input)
+        final_response = api_response([text_block(case.final_text)], stop_reason="end_turn")
+        mock_anthropic_client.messages.create.side_effect = [tool_response, final_response]
         
         # Setup vector store search results
-        search_results = SearchResults(
-            documents=["RAG stands for Retrieval-Augmented Generation..."],
-            metadata=[{"course_title": "Introduction to RAG", "lesson_number": 1, "chunk_id": "chunk1"}],
-            distances=[0.1]
-        )
-        mock_vector_store.search.return_value = search_results
-        mock_vector_store.get_lesson_link.return_value = "https://example.com/lesson1"
+        mock_vector_store.search.return_value = case.search_results
+        if case.lesson_link is not None:
+            mock_vector_store.get_lesson_link.return_value = case.lesson_link
         
         # Execute the query
-        response, sources = rag_system.query("What are RAG systems?", session_id="test_session")
+        response, sources = rag_system.query(case.query, session_id=case.session_id)
         
-        # Verify the complete flow
-        assert response == "RAG stands for Retrieval-Augmented Generation. It combines information retrieval with text generation to provide accurate, contextual responses."
-        assert len(sources) == 1
-        assert "Introduction to RAG - Lesson 1" in sources[0]
-        assert "https://example.com/lesson1" in sources[0]
+        # Verify the response
+        assert response == case.final_text
+        for needle in case.expected_substrings:
+            assert needle in response.lower()
+        
+        # Verify sources are properly extracted
+        assert len(sources) == case.source_count
+        for source in sources:
+            for needle in case.source_needles:
+                assert needle in source
+        
+        # Verify sources are reset after retrieval
+        assert len(rag_system.tool_manager.get_last_sources()) == 0
         
         # Verify AI was called with tools
         assert mock_anthropic_client.messages.create.call_count == 2
@@ -77,28 +182,17 @@ class TestRAGSystemIntegration:
         
         # Verify vector store was called correctly
         mock_vector_store.search.assert_called_once()
-        search_call_args = mock_vector_store.search.call_args
-        assert search_call_args.kwargs["query"] == "RAG systems"
+        assert mock_vector_store.search.call_args.kwargs["query"] == case.tool_input["query"]
 
-    def test_end_to_end_outline_query(self, rag_system, mock_anthropic_client, mock_vector_store):
+    def test_end_to_end_outline_query(self, rag_system, mock_anthropic_client, mock_vector_store, make_tool_response):
         """Test complete flow for course outline request"""
         # Setup: Mock AI response that uses the outline tool
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "get_course_outline"
-        mock_tool_block.id = "tool_outline_456"
-        mock_tool_block.input = {"course_title": "Introduction"}
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
+        tool_response, _ = make_tool_response("get_course_outline", "tool_outline_456", {"course_title": "Introduction"})
         
         # Mock final response after tool execution
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "The Introduction course covers 2 lessons: 1. What is RAG? and 2. RAG Applications."
+        final_response = api_response([text_block("The Introduction course covers 2 lessons: 1. What is RAG? and 2. RAG Applications.")], stop_reason="end_turn")
         
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
+        mock_anthropic_client.messages.create.side_effect = [tool_response, final_response]
         
         # Setup vector store for outline query
         mock_vector_store._resolve_course_name.return_value = "Introduction to RAG"
@@ -124,11 +218,8 @@ class TestRAGSystemIntegration:
         rag_system.session_manager.add_exchange(session_id, "Previous question", "Previous answer")
         
         # Setup mock response
-        mock_response = Mock()
-        mock_response.content = [Mock()]
-        mock_response.content[0].text = "Response with context"
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        ai_response = api_response([text_block("Response with context")], stop_reason="end_turn")
+        mock_anthropic_client.messages.create.return_value = ai_response
         
         # Execute query with session
         response, sources = rag_system.query("Follow-up question", session_id=session_id)
@@ -170,50 +261,6 @@ class TestRAGSystemIntegration:
         assert "input_schema" in outline_tool_def
         assert "course_title" in outline_tool_def["input_schema"]["properties"]
 
-    def test_source_extraction_and_propagation(self, rag_system, mock_anthropic_client, mock_vector_store):
-        """Test that sources are properly extracted and propagated through the system"""
-        # Setup tool usage scenario
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_123"
-        mock_tool_block.input = {"query": "lesson content", "lesson_number": 2}
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-        
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "Lesson 2 content response"
-        
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
-        
-        # Setup search results with multiple sources
-        search_results = SearchResults(
-            documents=["Content from lesson 2", "More lesson 2 content"],
-            metadata=[
-                {"course_title": "MCP Course", "lesson_number": 2, "chunk_id": "chunk1"},
-                {"course_title": "MCP Course", "lesson_number": 2, "chunk_id": "chunk2"}
-            ],
-            distances=[0.1, 0.2]
-        )
-        mock_vector_store.search.return_value = search_results
-        mock_vector_store.get_lesson_link.return_value = "https://example.com/mcp-lesson2"
-        
-        # Execute query
-        response, sources = rag_system.query("What is covered in lesson 2 of the MCP course?")
-        
-        # Verify sources are properly extracted
-        assert len(sources) == 2
-        for source in sources:
-            assert "MCP Course - Lesson 2" in source
-            assert "https://example.com/mcp-lesson2" in source
-        
-        # Verify sources are reset after retrieval
-        reset_sources = rag_system.tool_manager.get_last_sources()
-        assert len(reset_sources) == 0
-
     def test_error_handling_anthropic_api_failure(self, rag_system, mock_anthropic_client):
         """Test error handling when Anthropic API fails"""
         # Setup API failure
@@ -225,24 +272,14 @@ class TestRAGSystemIntegration:
         
         assert "API connection failed" in str(exc_info.value)
 
-    def test_error_handling_vector_store_failure(self, rag_system, mock_anthropic_client, mock_vector_store):
+    def test_error_handling_vector_store_failure(self, rag_system, mock_anthropic_client, mock_vector_store, make_tool_response):
         """Test error handling when vector store search fails"""
         # Setup tool usage scenario
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_error"
-        mock_tool_block.input = {"query": "test query"}
+        tool_response, _ = make_tool_response("search_course_content", "tool_error", {"query": "test query"})
         
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
+        final_response = api_response([text_block("I couldn't find any relevant information.")], stop_reason="end_turn")
         
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "I couldn't find any relevant information."
-        
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
+        mock_anthropic_client.messages.create.side_effect = [tool_response, final_response]
         
         # Setup vector store to return error results
         error_results = SearchResults.empty("Database connection error")
@@ -255,42 +292,28 @@ class TestRAGSystemIntegration:
         assert response == "I couldn't find any relevant information."
         assert len(sources) == 0
 
-    def test_error_handling_tool_execution_failure(self, rag_system, mock_anthropic_client):
+    def test_error_handling_tool_execution_failure(self, rag_system, mock_anthropic_client, make_tool_response):
         """Test error handling when tool execution fails"""
         # Setup tool usage scenario
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_fail"
-        mock_tool_block.input = {"query": "test"}
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
+        tool_response, _ = make_tool_response("search_course_content", "tool_fail", {"query": "test"})
         
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "Tool execution failed, but I can still respond."
+        final_response = api_response([text_block("Tool execution failed, but I can still respond.")], stop_reason="end_turn")
         
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
+        mock_anthropic_client.messages.create.side_effect = [tool_response, final_response]
         
         # Mock tool manager to raise exception
-        with patch.object(rag_system.tool_manager, 'execute_tool', side_effect=Exception("Tool failure")):
+        with raise_on(rag_system.tool_manager, 'execute_tool', Exception("Tool failure")):
             # The system should handle this gracefully through the AI generator
             with pytest.raises(Exception):
                 rag_system.query("Test query")
 
     def test_error_handling_session_manager_failure(self, rag_system, mock_anthropic_client):
         """Test error handling when session manager operations fail"""
-        mock_response = Mock()
-        mock_response.content = [Mock()]
-        mock_response.content[0].text = "Response despite session error"
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        ai_response = api_response([text_block("Response despite session error")], stop_reason="end_turn")
+        mock_anthropic_client.messages.create.return_value = ai_response
         
         # Mock session manager to fail on get_conversation_history
-        with patch.object(rag_system.session_manager, 'get_conversation_history', 
-                         side_effect=Exception("Session storage error")):
+        with raise_on(rag_system.session_manager, 'get_conversation_history', Exception("Session storage error")):
             # System should still work without history
             response, sources = rag_system.query("Test query", session_id="failing_session")
             
@@ -302,8 +325,7 @@ class TestRAGSystemIntegration:
         """Test error handling when multiple components fail in sequence"""
         # This test simulates the "query failed" error scenario
         # Mock AI generator to fail
-        with patch.object(rag_system.ai_generator, 'generate_response', 
-                         side_effect=Exception("AI service unavailable")):
+        with raise_on(rag_system.ai_generator, 'generate_response', Exception("AI service unavailable")):
             with pytest.raises(Exception) as exc_info:
                 rag_system.query("Test query")
             
@@ -312,111 +334,30 @@ class TestRAGSystemIntegration:
     def test_error_handling_malformed_ai_response(self, rag_system, mock_anthropic_client):
         """Test handling of malformed AI responses"""
         # Setup malformed response (missing content)
-        mock_response = Mock()
-        mock_response.content = []
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        ai_response = api_response([], stop_reason="end_turn")
+        mock_anthropic_client.messages.create.return_value = ai_response
         
         # Execute query and expect error handling
         with pytest.raises(IndexError):
             rag_system.query("Test query")
 
-    def test_error_handling_tool_response_parsing_failure(self, rag_system, mock_anthropic_client):
+    def test_error_handling_tool_response_parsing_failure(self, rag_system, mock_anthropic_client, make_tool_response):
         """Test error handling when tool responses cannot be parsed"""
         # Setup tool response with malformed input
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "malformed_tool"
-        mock_tool_block.input = None  # Malformed input
+        tool_response, _ = make_tool_response("search_course_content", "malformed_tool", None)  # Malformed input
         
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-        
-        mock_anthropic_client.messages.create.return_value = mock_tool_response
+        mock_anthropic_client.messages.create.return_value = tool_response
         
         # Execute and expect error propagation
         with pytest.raises(Exception):
             rag_system.query("Test query")
 
-    def test_empty_search_results_handling(self, rag_system, mock_anthropic_client, mock_vector_store):
-        """Test handling of empty search results"""
-        # Setup tool usage scenario
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_empty"
-        mock_tool_block.input = {"query": "nonexistent topic"}
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-        
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "No relevant content found."
-        
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
-        
-        # Setup empty search results
-        empty_results = SearchResults(documents=[], metadata=[], distances=[])
-        mock_vector_store.search.return_value = empty_results
-        
-        # Execute query
-        response, sources = rag_system.query("Tell me about nonexistent topic")
-        
-        # Verify empty results are handled properly
-        assert response == "No relevant content found."
-        assert len(sources) == 0
-
-    def test_real_user_scenario_lesson_specific_query(self, rag_system, mock_anthropic_client, mock_vector_store):
-        """Test real user scenario: 'What is covered in lesson 2 of the MCP course?'"""
-        # Setup tool usage for lesson-specific query
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_lesson"
-        mock_tool_block.input = {"query": "covered", "course_name": "MCP", "lesson_number": 2}
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-        
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "Lesson 2 of the MCP course covers server setup, client configuration, and basic protocol implementation."
-        
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
-        
-        # Setup realistic search results
-        search_results = SearchResults(
-            documents=["In this lesson, we'll cover MCP server setup and client configuration..."],
-            metadata=[{"course_title": "MCP Protocol Course", "lesson_number": 2, "chunk_id": "lesson2_chunk1"}],
-            distances=[0.05]
-        )
-        mock_vector_store.search.return_value = search_results
-        mock_vector_store.get_lesson_link.return_value = "https://courses.example.com/mcp/lesson2"
-        
-        # Execute realistic user query
-        response, sources = rag_system.query("What is covered in lesson 2 of the MCP course?")
-        
-        # Verify realistic response
-        assert "server setup" in response.lower()
-        assert "client configuration" in response.lower()
-        assert len(sources) == 1
-        assert "MCP Protocol Course - Lesson 2" in sources[0]
-        assert "https://courses.example.com/mcp/lesson2" in sources[0]
-
     def test_real_user_scenario_general_knowledge_query(self, rag_system, mock_anthropic_client):
         """Test real user scenario: 'Tell me about RAG systems' (general knowledge)"""
         # Setup non-tool response for general knowledge
-        mock_response = Mock()
-        mock_response.content = [Mock()]
-        mock_response.content[0].text = "RAG systems combine retrieval and generation to provide accurate, contextual responses by first retrieving relevant information and then generating responses based on that information."
-        mock_response.stop_reason = "end_turn"
+        ai_response = api_response([text_block("RAG systems combine retrieval and generation to provide accurate, contextual responses by first retrieving relevant information and then generating responses based on that information.")], stop_reason="end_turn")
         
-        mock_anthropic_client.messages.create.return_value = mock_response
+        mock_anthropic_client.messages.create.return_value = ai_response
         
         # Execute general knowledge query
         response, sources = rag_system.query("Tell me about RAG systems")
@@ -426,85 +367,7 @@ class TestRAGSystemIntegration:
         assert "generation" in response.lower()
         assert len(sources) == 0  # No tool usage = no sources
 
-    def test_real_user_scenario_course_not_found(self, rag_system, mock_anthropic_client, mock_vector_store):
-        """Test real user scenario: Query for non-existent course"""
-        # Setup tool usage for non-existent course
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_notfound"
-        mock_tool_block.input = {"query": "advanced topics", "course_name": "NonexistentCourse"}
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-        
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "I couldn't find any course matching 'NonexistentCourse'."
-        
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
-        
-        # Setup empty search results for non-existent course
-        empty_results = SearchResults(documents=[], metadata=[], distances=[])
-        mock_vector_store.search.return_value = empty_results
-        
-        # Execute realistic query for non-existent course
-        response, sources = rag_system.query("What advanced topics are covered in NonexistentCourse?")
-        
-        # Verify appropriate handling of non-existent course
-        assert response == "I couldn't find any course matching 'NonexistentCourse'."
-        assert len(sources) == 0
-
-    def test_real_user_scenario_complex_multi_parameter_query(self, rag_system, mock_anthropic_client, mock_vector_store):
-        """Test real user scenario: Complex query with multiple parameters"""
-        # Setup tool usage with multiple parameters
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_complex"
-        mock_tool_block.input = {
-            "query": "deployment strategies",
-            "course_name": "DevOps",
-            "lesson_number": 5
-        }
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-        
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "Lesson 5 of the DevOps course covers three main deployment strategies: blue-green deployment, rolling updates, and canary deployments. Each has specific use cases and trade-offs."
-        
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
-        
-        # Setup realistic search results with detailed metadata
-        search_results = SearchResults(
-            documents=["Deployment strategies include blue-green deployment for zero-downtime updates, rolling updates for gradual rollouts..."],
-            metadata=[{
-                "course_title": "DevOps Fundamentals", 
-                "lesson_number": 5, 
-                "chunk_id": "lesson5_deployment_chunk1",
-                "lesson_title": "Deployment Strategies"
-            }],
-            distances=[0.02]
-        )
-        mock_vector_store.search.return_value = search_results
-        mock_vector_store.get_lesson_link.return_value = "https://courses.example.com/devops/lesson5-deployment"
-        
-        # Execute complex multi-parameter query
-        response, sources = rag_system.query("What deployment strategies are discussed in lesson 5 of the DevOps course?")
-        
-        # Verify detailed response handling
-        assert "blue-green" in response.lower()
-        assert "rolling" in response.lower()
-        assert "canary" in response.lower()
-        assert len(sources) == 1
-        assert "DevOps Fundamentals - Lesson 5" in sources[0]
-        assert "https://courses.example.com/devops/lesson5-deployment" in sources[0]
-
-    def test_real_user_scenario_outline_with_session_context(self, rag_system, mock_anthropic_client, mock_vector_store):
+    def test_real_user_scenario_outline_with_session_context(self, rag_system, mock_anthropic_client, mock_vector_store, make_tool_response):
         """Test real user scenario: Outline request within a conversation session"""
         # Create session and add context
         session_id = rag_system.session_manager.create_session()
@@ -515,21 +378,11 @@ class TestRAGSystemIntegration:
         )
         
         # Setup outline tool usage
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "get_course_outline"
-        mock_tool_block.id = "tool_outline_session"
-        mock_tool_block.input = {"course_title": "MCP"}
+        tool_response, _ = make_tool_response("get_course_outline", "tool_outline_session", {"course_title": "MCP"})
         
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
+        final_response = api_response([text_block("The MCP Protocol Course covers 4 lessons: 1. Introduction to MCP, 2. Server Implementation, 3. Client Configuration, and 4. Advanced Features.")], stop_reason="end_turn")
         
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "The MCP Protocol Course covers 4 lessons: 1. Introduction to MCP, 2. Server Implementation, 3. Client Configuration, and 4. Advanced Features."
-        
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
+        mock_anthropic_client.messages.create.side_effect = [tool_response, final_response]
         
         # Setup course metadata for outline
         mock_vector_store._resolve_course_name.return_value = "MCP Protocol Course"
@@ -563,28 +416,14 @@ class TestRAGSystemIntegration:
     def test_multiple_tool_calls_within_limit(self, rag_system, mock_anthropic_client, mock_vector_store):
         """Test that the system properly handles the one-tool-per-query limit"""
         # Setup response with multiple tool blocks (should only execute first one based on system design)
-        mock_tool_response = Mock()
-        
-        mock_tool_block1 = Mock()
-        mock_tool_block1.type = "tool_use"
-        mock_tool_block1.name = "search_course_content"
-        mock_tool_block1.id = "tool_1"
-        mock_tool_block1.input = {"query": "first query"}
-        
-        mock_tool_block2 = Mock()
-        mock_tool_block2.type = "tool_use"
-        mock_tool_block2.name = "get_course_outline"
-        mock_tool_block2.id = "tool_2" 
-        mock_tool_block2.input = {"course_title": "second query"}
+        tool_response = api_response([
+            tool_use_block("search_course_content", "tool_1", {"query": "first query"}),
+            tool_use_block("get_course_outline", "tool_2", {"course_title": "second query"}),
+        ])
         
-        mock_tool_response.content = [mock_tool_block1, mock_tool_block2]
-        mock_tool_response.stop_reason = "tool_use"
+        final_response = api_response([text_block("Response after tool execution")], stop_reason="end_turn")
         
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "Response after tool execution"
-        
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
+        mock_anthropic_client.messages.create.side_effect = [tool_response, final_response]
         
         # Setup mock results
         search_results = SearchResults(
@@ -706,11 +545,8 @@ class TestRAGSystemErrorScenarios:
 
     def test_session_without_history(self, rag_system, mock_anthropic_client):
         """Test querying with a session ID that has no history"""
-        mock_response = Mock()
-        mock_response.content = [Mock()]
-        mock_response.content[0].text = "Response without context"
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        ai_response = api_response([text_block("Response without context")], stop_reason="end_turn")
+        mock_anthropic_client.messages.create.return_value = ai_response
         
         # Query with non-existent session
         response, sources = rag_system.query("Test query", session_id="nonexistent_session")
@@ -734,8 +570,7 @@ class TestRAGSystemErrorScenarios:
     def test_malformed_tool_input(self, rag_system, mock_vector_store):
         """Test handling of malformed tool input"""
         # Setup empty results for malformed query
-        empty_results = SearchResults(documents=[], metadata=[], distances=[])
-        mock_vector_store.search.return_value = empty_results
+        mock_vector_store.search.return_value = _EMPTY_RESULTS
         
         # Execute with missing required parameters (should be handled by tool)
         result = rag_system.search_tool.execute()  # No query parameter
@@ -754,11 +589,8 @@ class TestRAGSystemErrorScenarios:
 
     def test_concurrent_session_management(self, rag_system, mock_anthropic_client):
         """Test session management with multiple concurrent sessions"""
-        mock_response = Mock()
-        mock_response.content = [Mock()]
-        mock_response.content[0].text = "Concurrent response"
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        ai_response = api_response([text_block("Concurrent response")], stop_reason="end_turn")
+        mock_anthropic_client.messages.create.return_value = ai_response
         
         # Create multiple sessions
         session1 = rag_system.session_manager.create_session()
@@ -845,26 +677,16 @@ class TestRAGSystemComponentInteraction:
                 if j != i:
                     assert f"Query {j}" not in history
 
-    def test_ai_generator_tool_integration_edge_cases(self, rag_system, mock_anthropic_client, mock_vector_store):
+    def test_ai_generator_tool_integration_edge_cases(self, rag_system, mock_anthropic_client, mock_vector_store, make_tool_response):
         """Test edge cases in AI generator and tool integration"""
         # Test with tool response containing unexpected fields
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "edge_case_tool"
-        mock_tool_block.input = {"query": "test", "unexpected_param": "value"}
-        mock_tool_block.unexpected_field = "should be ignored"
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_response.unexpected_response_field = "should be ignored"
+        tool_response, tool_block = make_tool_response("search_course_content", "edge_case_tool", {"query": "test", "unexpected_param": "value"})
+        tool_block.unexpected_field = "should be ignored"
+        tool_response.unexpected_response_field = "should be ignored"
         
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "Response despite unexpected fields"
+        final_response = api_response([text_block("Response despite unexpected fields")], stop_reason="end_turn")
         
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
+        mock_anthropic_client.messages.create.side_effect = [tool_response, final_response]
         
         # Setup normal search results
         search_results = SearchResults(
@@ -880,24 +702,14 @@ class TestRAGSystemComponentInteraction:
         assert response == "Response despite unexpected fields"
         # Tool should have handled unexpected parameters gracefully
 
-    def test_vector_store_search_result_edge_cases(self, rag_system, mock_anthropic_client, mock_vector_store):
+    def test_vector_store_search_result_edge_cases(self, rag_system, mock_anthropic_client, mock_vector_store, make_tool_response):
         """Test handling of edge cases in search results"""
         # Setup tool usage scenario
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "edge_search"
-        mock_tool_block.input = {"query": "edge case"}
+        tool_response, _ = make_tool_response("search_course_content", "edge_search", {"query": "edge case"})
         
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
+        final_response = api_response([text_block("Handled edge case results")], stop_reason="end_turn")
         
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "Handled edge case results"
-        
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
+        mock_anthropic_client.messages.create.side_effect = [tool_response, final_response]
         
         # Setup search results with missing/malformed metadata
         edge_case_results = SearchResults(
@@ -952,11 +764,8 @@ class TestRAGSystemPerformanceIntegration:
 
     def test_large_conversation_history_handling(self, rag_system, mock_anthropic_client):
         """Test handling of large conversation histories"""
-        mock_response = Mock()
-        mock_response.content = [Mock()]
-        mock_response.content[0].text = "Response with large history"
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        ai_response = api_response([text_block("Response with large history")], stop_reason="end_turn")
+        mock_anthropic_client.messages.create.return_value = ai_response
         
         # Create session and add many exchanges
         session_id = rag_system.session_manager.create_session()
@@ -980,24 +789,14 @@ class TestRAGSystemPerformanceIntegration:
         assert "Question 0" not in history  # Old exchanges should be removed
         assert "Final question" in history  # New exchange should be present
 
-    def test_multiple_tools_performance(self, rag_system, mock_anthropic_client, mock_vector_store):
+    def test_multiple_tools_performance(self, rag_system, mock_anthropic_client, mock_vector_store, make_tool_response):
         """Test performance when multiple tools are available"""
         # Setup tool response
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "perf_tool"
-        mock_tool_block.input = {"query": "performance test"}
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
+        tool_response, _ = make_tool_response("search_course_content", "perf_tool", {"query": "performance test"})
         
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "Performance test response"
+        final_response = api_response([text_block("Performance test response")], stop_reason="end_turn")
         
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
+        mock_anthropic_client.messages.create.side_effect = [tool_response, final_response]
         
         # Setup search results
         search_results = SearchResults(
@@ -1016,11 +815,8 @@ class TestRAGSystemPerformanceIntegration:
 
     def test_stress_test_rapid_queries(self, rag_system, mock_anthropic_client):
         """Test system stability under rapid successive queries"""
-        mock_response = Mock()
-        mock_response.content = [Mock()]
-        mock_response.content[0].text = "Rapid response"
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        ai_response = api_response([text_block("Rapid response")], stop_reason="end_turn")
+        mock_anthropic_client.messages.create.return_value = ai_response
         
         # Execute multiple rapid queries
         session_id = rag_system.session_manager.create_session()
@@ -1064,20 +860,12 @@ class TestRAGSystemFailureTracking:
             # Verify error message propagates correctly
             assert case["expected_msg"] in str(exc_info.value)
 
-    def test_error_origin_identification_vector_store(self, rag_system, mock_anthropic_client, mock_vector_store):
+    def test_error_origin_identification_vector_store(self, rag_system, mock_anthropic_client, mock_vector_store, make_tool_response):
         """Test error identification when vector store is the source of failure"""
         # Setup tool usage scenario first
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "vector_error_test"
-        mock_tool_block.input = {"query": "test"}
+        tool_response, _ = make_tool_response("search_course_content", "vector_error_test", {"query": "test"})
         
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
-        
-        mock_anthropic_client.messages.create.return_value = mock_tool_response
+        mock_anthropic_client.messages.create.return_value = tool_response
         
         # Test different vector store failure scenarios
         vector_errors = [
@@ -1100,11 +888,8 @@ class TestRAGSystemFailureTracking:
 
     def test_error_origin_identification_session_manager(self, rag_system, mock_anthropic_client):
         """Test error identification when session manager is the source of failure"""
-        mock_response = Mock()
-        mock_response.content = [Mock()]
-        mock_response.content[0].text = "Test response"
-        mock_response.stop_reason = "end_turn"
-        mock_anthropic_client.messages.create.return_value = mock_response
+        ai_response = api_response([text_block("Test response")], stop_reason="end_turn")
+        mock_anthropic_client.messages.create.return_value = ai_response
         
         # Test session manager failures
         session_errors = [
@@ -1114,8 +899,7 @@ class TestRAGSystemFailureTracking:
         ]
         
         for case in session_errors:
-            with patch.object(rag_system.session_manager, case["method"], 
-                            side_effect=case["error"]):
+            with raise_on(rag_system.session_manager, case["method"], case["error"]):
                 try:
                     if case["method"] == "create_session":
                         # Test session creation failure
@@ -1129,20 +913,12 @@ class TestRAGSystemFailureTracking:
                     assert any(keyword in error_msg.lower() for keyword in 
                               ["session", "memory", "storage", "collision"])
 
-    def test_error_origin_identification_tool_execution(self, rag_system, mock_anthropic_client):
+    def test_error_origin_identification_tool_execution(self, rag_system, mock_anthropic_client, make_tool_response):
         """Test error identification when tool execution is the source of failure"""
         # Setup tool usage scenario
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_error_test"
-        mock_tool_block.input = {"query": "test"}
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
+        tool_response, _ = make_tool_response("search_course_content", "tool_error_test", {"query": "test"})
         
-        mock_anthropic_client.messages.create.return_value = mock_tool_response
+        mock_anthropic_client.messages.create.return_value = tool_response
         
         # Test tool execution failures
         tool_errors = [
@@ -1153,7 +929,7 @@ class TestRAGSystemFailureTracking:
         ]
         
         for error in tool_errors:
-            with patch.object(rag_system.tool_manager, 'execute_tool', side_effect=error):
+            with raise_on(rag_system.tool_manager, 'execute_tool', error):
                 with pytest.raises(Exception) as exc_info:
                     rag_system.query("Test tool error")
                 
@@ -1177,7 +953,7 @@ class TestRAGSystemFailureTracking:
         for component_name, method_name, error in components:
             component = getattr(rag_system, component_name)
             
-            with patch.object(component, method_name, side_effect=error):
+            with raise_on(component, method_name, error):
                 with pytest.raises(Exception) as exc_info:
                     rag_system.query("Test component chain error")
                 
@@ -1191,27 +967,17 @@ class TestRAGSystemFailureTracking:
                 
                 assert any(keyword in error_msg.lower() for keyword in expected_keywords[component_name])
 
-    def test_query_failure_recovery_mechanisms(self, rag_system, mock_anthropic_client, mock_vector_store):
+    def test_query_failure_recovery_mechanisms(self, rag_system, mock_anthropic_client, mock_vector_store, make_tool_response):
         """Test how the system handles and recovers from 'query failed' scenarios"""
         # Simulate the most common "query failed" scenario:
         # Tool call succeeds but returns error results
         
-        mock_tool_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "recovery_test"
-        mock_tool_block.input = {"query": "recovery test"}
-        
-        mock_tool_response.content = [mock_tool_block]
-        mock_tool_response.stop_reason = "tool_use"
+        tool_response, _ = make_tool_response("search_course_content", "recovery_test", {"query": "recovery test"})
         
         # Mock final response that handles the error gracefully
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock()]
-        mock_final_response.content[0].text = "I encountered an error while searching, but here's what I can tell you based on general knowledge."
+        final_response = api_response([text_block("I encountered an error while searching, but here's what I can tell you based on general knowledge.")], stop_reason="end_turn")
         
-        mock_anthropic_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
+        mock_anthropic_client.messages.create.side_effect = [tool_response, final_response]
         
         # Setup vector store to return error results
         error_results = SearchResults.empty("Database temporarily unavailable")
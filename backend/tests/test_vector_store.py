@@ -17,11 +17,6 @@ import json
 from unittest.mock import Mock, MagicMock, patch, call
 from typing import Dict, List, Any, Optional
 
-# Add parent directory to path to import backend modules
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
 from vector_store import VectorStore, SearchResults
 from models import Course, CourseChunk, Lesson
 
@@ -137,7 +137,7 @@ healthy_report = {
             "check_name": "Anthropic API Functionality",
             "status": "passed",
             "message": "API responding correctly",
-            "details": {"model": "claude-sonnet-4-20250514", "response": "WORKING"},
+            "details": {"model": "claude-sonnet-4-20250514", "stop_reason": "max_tokens"},
             "remediation": None
         },
         {